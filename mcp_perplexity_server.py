@@ -5,14 +5,212 @@ Uses fastmcp to create an MCP server with a search_web tool that calls
 Perplexity Search API directly (not using the SDK).
 """
 
+import asyncio
 import os
-from typing import Optional, List, Dict, Any
+import time
+from collections import OrderedDict
+from typing import Optional, List, Dict, Any, AsyncIterator, NamedTuple, Tuple, Union
 from dotenv import load_dotenv
 from fastmcp import FastMCP
 import httpx
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    import json
+    ORJSON_AVAILABLE = False
+
+try:
+    import h2  # noqa: F401 - only needed so httpx can negotiate HTTP/2
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
 load_dotenv()
 
+PERPLEXITY_SEARCH_URL = "https://api.perplexity.ai/search"
+
+# Read the API key once at import; it is validated when a search is made.
+_API_KEY = os.getenv("PERPLEXITY_API_KEY")
+_AUTH_HEADERS = {
+    "Authorization": f"Bearer {_API_KEY}",
+    "Content-Type": "application/json",
+} if _API_KEY else None
+
+# Shared async HTTP client, created on first use. Reusing it keeps keep-alive
+# connections to the API warm, and being async lets concurrent tool calls
+# overlap while they wait on the network. With HTTP/2 those concurrent calls
+# are multiplexed over one TLS connection.
+#
+# An AsyncClient's connection pool belongs to the event loop it is first used
+# on, so the client is remembered together with that loop and replaced when
+# called from a different one (e.g. repeated asyncio.run() or one loop per
+# test). Each client is closed while its own loop is still running: it is
+# parked in a suspended async generator, which asyncio.run() finalizes via
+# loop.shutdown_asyncgens() before closing the loop. Closing it later from
+# another loop is not possible once its loop has closed.
+_client: Optional[httpx.AsyncClient] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+_client_lifetime: Optional[AsyncIterator[None]] = None
+
+
+async def _own_async_client(client: httpx.AsyncClient) -> AsyncIterator[None]:
+    """Suspend until the event loop shuts down its async generators, then close client."""
+    try:
+        yield
+    finally:
+        await client.aclose()
+
+
+async def _get_client() -> httpx.AsyncClient:
+    """Return the async httpx client for the running event loop, creating it if needed."""
+    global _client, _client_loop, _client_lifetime
+    loop = asyncio.get_running_loop()
+    if _client is None or _client_loop is not loop:
+        client = httpx.AsyncClient(
+            timeout=30.0,
+            http2=HTTP2_AVAILABLE,
+            limits=httpx.Limits(max_keepalive_connections=32, max_connections=64),
+            headers=_AUTH_HEADERS,
+        )
+        lifetime = _own_async_client(client)
+        # Starting the generator registers it with this loop's shutdown hooks
+        await lifetime.__anext__()
+        _client, _client_loop, _client_lifetime = client, loop, lifetime
+    return _client
+
+
+def _loads(content: Union[bytes, bytearray]) -> Any:
+    """Decode a JSON response body, using orjson when it is installed."""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def _dumps(obj: Any) -> bytes:
+    """Encode obj as a compact JSON request body, using orjson when it is installed."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+
+async def _post_search(request_body: bytes) -> Any:
+    """POST request_body to the Search API and return the decoded JSON response.
+    
+    The body is streamed into one growing buffer rather than letting httpx
+    collect chunks and join them, so a large response is only held once before
+    being decoded. The buffer is local to this function, so it is freed as soon
+    as the decoded data is returned.
+    """
+    async with (await _get_client()).stream(
+        "POST",
+        PERPLEXITY_SEARCH_URL,
+        content=request_body,
+    ) as response:
+        if response.is_error:
+            await response.aread()
+        response.raise_for_status()
+        body = bytearray()
+        async for part in response.aiter_bytes():
+            body += part
+    return _loads(body)
+
+
+def _count_tokens(text: Optional[str]) -> int:
+    """Approximate token count as the number of whitespace-separated words."""
+    return len(text.split()) if text else 0
+
+
+class Source(NamedTuple):
+    """A search result's title, URL and optional date."""
+    title: str
+    url: str
+    date: Optional[str] = None
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to the tool's JSON shape, omitting date when it is unknown."""
+        data: Dict[str, Any] = {"title": self.title, "url": self.url}
+        if self.date:
+            data["date"] = self.date
+        return data
+
+
+class Chunk(NamedTuple):
+    """A text excerpt ("chunk") from a search result, with size metadata."""
+    title: str
+    url: str
+    chunk: str
+    chunk_length: int
+    chunk_tokens: int
+    date: Optional[str] = None
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to the tool's JSON shape, omitting date when it is unknown."""
+        data: Dict[str, Any] = {
+            "title": self.title,
+            "url": self.url,
+            "source": self.url,
+            "chunk": self.chunk,  # Using "chunk" terminology as Perplexity does
+            "chunk_length": self.chunk_length,
+            "chunk_tokens": self.chunk_tokens,
+        }
+        if self.date:
+            data["date"] = self.date
+        return data
+
+
+def _build_response(query: str, sources: List[Source], chunks: List[Chunk]) -> Dict[str, Any]:
+    """Convert the compact source and chunk records into the search_web return value."""
+    chunk_dicts = [chunk.to_dict() for chunk in chunks]
+    # "results" is kept for existing callers but shares the chunks list rather
+    # than duplicating every chunk record in a second, near-identical shape
+    return {
+        "query": query,
+        "sources": [source.to_dict() for source in sources],
+        "chunks": chunk_dicts,
+        "results": chunk_dicts,
+        "total_sources": len(sources),
+        "total_chunks": len(chunks),
+    }
+
+
+# Recently processed search results, keyed by the normalized tool arguments.
+# Agents often repeat a search within a session (retries, re-planning), so
+# these are answered from memory instead of another API round-trip. Entries
+# hold the compact Source/Chunk records; dicts are built per call.
+_CachedResult = Tuple[List[Source], List[Chunk]]
+_CACHE_MAXSIZE = 256
+_CACHE_TTL_SECONDS = 300.0
+_cache: "OrderedDict[Tuple[Any, ...], Tuple[float, _CachedResult]]" = OrderedDict()
+
+
+def _cache_get(key: Tuple[Any, ...]) -> Optional[_CachedResult]:
+    """Return the cached result for key, or None if it is missing or expired."""
+    entry = _cache.get(key)
+    if entry is None:
+        return None
+    expires_at, value = entry
+    if expires_at < time.monotonic():
+        del _cache[key]
+        return None
+    _cache.move_to_end(key)
+    return value
+
+
+def _cache_put(key: Tuple[Any, ...], value: _CachedResult) -> None:
+    """Store value under key, evicting the least recently used entry when full."""
+    _cache[key] = (time.monotonic() + _CACHE_TTL_SECONDS, value)
+    _cache.move_to_end(key)
+    if len(_cache) > _CACHE_MAXSIZE:
+        _cache.popitem(last=False)
+
+
+def clear_search_cache() -> None:
+    """Drop all cached search results."""
+    _cache.clear()
+
+
 # Initialize the MCP server
 mcp = FastMCP(
     name="Perplexity Search MCP Server",
@@ -21,7 +219,7 @@ mcp = FastMCP(
 
 
 @mcp.tool()
-def search_web(
+async def search_web(
     query: str,
     max_results: int = 10,
     max_tokens: Optional[int] = None,
@@ -51,15 +249,27 @@ def search_web(
         search_recency_filter: Get only recent content - "day", "week", "month", or "year"
     
     Returns:
-        Search results with sources, text excerpts, and metadata
+        Search results with sources, text excerpts, and metadata.
+        "results" contains the same entries as "chunks".
     """
-    api_key = os.getenv("PERPLEXITY_API_KEY")
-    if not api_key:
+    if not _API_KEY:
         raise ValueError(
             "PERPLEXITY_API_KEY environment variable is not set. "
             "Please set it in your .env file or environment."
         )
     
+    cache_key = (
+        query,
+        max_results,
+        max_tokens,
+        max_tokens_per_page,
+        frozenset(search_domain_filter or ()),
+        search_recency_filter,
+    )
+    cached = _cache_get(cache_key)
+    if cached is not None:
+        return _build_response(query, *cached)
+    
     # Prepare the request payload
     payload: Dict[str, Any] = {
         "query": query,
@@ -77,21 +287,11 @@ def search_web(
     if search_recency_filter:
         payload["search_recency_filter"] = search_recency_filter
     
-    # Make the API request
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
-    
+    # Make the API request (auth headers are set on the shared client).
+    # The body is encoded here so httpx does not re-serialize it with stdlib json.
+    request_body = _dumps(payload)
     try:
-        with httpx.Client(timeout=30.0) as client:
-            response = client.post(
-                "https://api.perplexity.ai/search",
-                json=payload,
-                headers=headers
-            )
-            response.raise_for_status()
-            data = response.json()
+        data = await _post_search(request_body)
     except httpx.HTTPStatusError as e:
         if e.response.status_code == 404:
             raise Exception(
@@ -105,64 +305,33 @@ def search_web(
     # Process the results
     results = data.get("results", [])
     
-    sources = []
-    chunks = []
-    processed_results = []
+    # Every result yields a source, so that list is sized up front and filled
+    # by index; not every result has a chunk, so chunks is appended to
+    sources: List[Source] = [None] * len(results)  # type: ignore[list-item]
+    chunks: List[Chunk] = []
     
-    for result in results:
-        # Extract source information
-        source = {
-            "title": result.get("title", "Untitled"),
-            "url": result.get("url", ""),
-        }
-        
+    for i, result in enumerate(results):
+        # Read each field once and build both records from the locals
+        title = result.get("title", "Untitled")
+        url = result.get("url", "")
         date = result.get("date") or result.get("last_updated")
-        if date:
-            source["date"] = date
-        
-        sources.append(source)
-        
         # Extract chunk (snippet) - Perplexity calls these chunks conceptually
         chunk_text = result.get("snippet")
         
-        if chunk_text:
-            # Create chunk data
-            chunk_data = {
-                "title": result.get("title", "Untitled"),
-                "url": result.get("url", ""),
-                "source": result.get("url", ""),
-                "chunk": chunk_text,  # Using "chunk" terminology as Perplexity does
-                "chunk_length": len(chunk_text),
-                "chunk_tokens": len(chunk_text.split()),  # Approximate token count
-            }
-            
-            if date:
-                chunk_data["date"] = date
-            
-            chunks.append(chunk_data)
-        
-        # Create processed result
-        result_item = {
-            "title": result.get("title", "Untitled"),
-            "url": result.get("url", ""),
-            "chunk": chunk_text,
-            "date": date
-        }
+        sources[i] = Source(title, url, date)
         
         if chunk_text:
-            result_item["chunk_length"] = len(chunk_text)
-            result_item["chunk_tokens"] = len(chunk_text.split())
-        
-        processed_results.append(result_item)
+            chunks.append(Chunk(
+                title,
+                url,
+                chunk_text,
+                len(chunk_text),
+                _count_tokens(chunk_text),
+                date,
+            ))
     
-    return {
-        "query": query,
-        "sources": sources,
-        "chunks": chunks,
-        "results": processed_results,
-        "total_sources": len(sources),
-        "total_chunks": len(chunks),
-    }
+    _cache_put(cache_key, (sources, chunks))
+    return _build_response(query, sources, chunks)
 
 
 if __name__ == "__main__":
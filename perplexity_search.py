@@ -8,9 +8,13 @@ Note: Perplexity API uses "chunks" terminology for text excerpts from web pages.
 You can control the number of tokens using max_tokens (total) and max_tokens_per_page.
 """
 
+import concurrent.futures
 import os
 import sys
-from typing import Optional, Dict, Any, List
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, Tuple
 from dotenv import load_dotenv
 
 try:
@@ -21,6 +25,119 @@ except ImportError:
 
 load_dotenv()
 
+# Read the API key once at import rather than on every call
+_API_KEY = os.getenv("PERPLEXITY_API_KEY")
+
+
+def _count_tokens(text: Optional[str]) -> int:
+    """Approximate token count as the number of whitespace-separated words."""
+    return len(text.split()) if text else 0
+
+
+# One SDK client per API key, so its pooled HTTP connections are reused.
+# The lock keeps concurrent first calls (e.g. test_max_tokens threads) from
+# each building their own client.
+_sdk_clients: Dict[str, "Perplexity"] = {}
+_sdk_clients_lock = threading.Lock()
+
+
+def _get_sdk_client(api_key: str) -> "Perplexity":
+    """Return the shared Perplexity client for api_key, creating it on first use."""
+    with _sdk_clients_lock:
+        client = _sdk_clients.get(api_key)
+        if client is None:
+            client = _sdk_clients[api_key] = Perplexity(api_key=api_key)
+        return client
+
+
+# Raw SDK responses are cached so repeated searches (e.g. test_max_tokens
+# sweeps or notebook re-runs) skip the network. Each entry expires
+# _SEARCH_CACHE_TTL_SECONDS after it was stored, matching the MCP server's
+# cache. A lock guards the dict because test_max_tokens searches from
+# several threads at once.
+_SEARCH_CACHE_MAXSIZE = 64
+_SEARCH_CACHE_TTL_SECONDS = 300.0
+_cache: "OrderedDict[Tuple[Any, ...], Tuple[float, Any]]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _cache_get(key: Tuple[Any, ...]) -> Optional[Any]:
+    """Return the cached response for key, or None if it is missing or expired."""
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del _cache[key]
+            return None
+        _cache.move_to_end(key)
+        return value
+
+
+def _cache_put(key: Tuple[Any, ...], value: Any) -> None:
+    """Store value under key, dropping expired entries and then the least recently used."""
+    with _cache_lock:
+        now = time.monotonic()
+        for stale_key in [k for k, (expires_at, _) in _cache.items() if expires_at < now]:
+            del _cache[stale_key]
+        _cache[key] = (now + _SEARCH_CACHE_TTL_SECONDS, value)
+        _cache.move_to_end(key)
+        if len(_cache) > _SEARCH_CACHE_MAXSIZE:
+            _cache.popitem(last=False)
+
+
+def clear_search_cache() -> None:
+    """Drop all cached search responses."""
+    with _cache_lock:
+        _cache.clear()
+
+
+def _cached_search(
+    api_key: str,
+    query: str,
+    max_results: int,
+    max_tokens: Optional[int],
+    max_tokens_per_page: int,
+    search_domain_filter: Optional[Tuple[str, ...]],
+    search_recency_filter: Optional[str],
+) -> Any:
+    """Call client.search.create, reusing a cached response for identical arguments."""
+    cache_key = (
+        api_key,
+        query,
+        max_results,
+        max_tokens,
+        max_tokens_per_page,
+        search_domain_filter,
+        search_recency_filter,
+    )
+    cached = _cache_get(cache_key)
+    if cached is not None:
+        return cached
+    
+    client = _get_sdk_client(api_key)
+    
+    search_params: Dict[str, Any] = {
+        "query": query,
+        "max_results": max_results,
+        "max_tokens_per_page": max_tokens_per_page,
+    }
+    
+    # Add max_tokens if provided (defaults to 25000 in API if not specified)
+    if max_tokens is not None:
+        search_params["max_tokens"] = max_tokens
+    
+    if search_domain_filter:
+        search_params["search_domain_filter"] = list(search_domain_filter)
+    
+    if search_recency_filter:
+        search_params["search_recency_filter"] = search_recency_filter
+    
+    search = client.search.create(**search_params)
+    _cache_put(cache_key, search)
+    return search
+
 
 def search_perplexity(
     query: str,
@@ -30,6 +147,7 @@ def search_perplexity(
     max_tokens_per_page: int = 2048,
     search_domain_filter: Optional[List[str]] = None,
     search_recency_filter: Optional[str] = None,
+    debug: bool = False,
 ) -> Dict[str, Any]:
     """
     Query Perplexity Search API using the official SDK to get sources with chunks.
@@ -50,12 +168,13 @@ def search_perplexity(
         max_tokens_per_page: Maximum tokens per page (default: 2048)
         search_domain_filter: List of domains to filter results (max 20 domains)
         search_recency_filter: Filter by recency - "day", "week", "month", or "year"
+        debug: Also return the raw SDK result's attributes under "_inspection_info"
     
     Returns:
         dict: Response with sources, chunks, and results
     """
     if api_key is None:
-        api_key = os.getenv("PERPLEXITY_API_KEY")
+        api_key = _API_KEY
     
     if not api_key:
         raise ValueError(
@@ -69,29 +188,20 @@ def search_perplexity(
         )
     
     try:
-        client = Perplexity(api_key=api_key)
-        
-        search_params: Dict[str, Any] = {
-            "query": query,
-            "max_results": max_results,
-            "max_tokens_per_page": max_tokens_per_page,
-        }
-        
-        # Add max_tokens if provided (defaults to 25000 in API if not specified)
-        if max_tokens is not None:
-            search_params["max_tokens"] = max_tokens
-        
-        if search_domain_filter:
-            search_params["search_domain_filter"] = search_domain_filter
-        
-        if search_recency_filter:
-            search_params["search_recency_filter"] = search_recency_filter
-        
-        search = client.search.create(**search_params)
+        search = _cached_search(
+            api_key,
+            query,
+            max_results,
+            max_tokens,
+            max_tokens_per_page,
+            tuple(sorted(set(search_domain_filter))) if search_domain_filter else None,
+            search_recency_filter,
+        )
         
         # Inspect raw SDK response to understand available fields
         # This helps verify what Perplexity SDK actually returns
-        if search.results and len(search.results) > 0:
+        inspection_info = None
+        if debug and search.results:
             first_raw_result = search.results[0]
             # Store inspection info for debugging
             inspection_info = {
@@ -101,20 +211,25 @@ def search_perplexity(
             if hasattr(first_raw_result, '__dict__'):
                 inspection_info["__dict__"] = first_raw_result.__dict__
         
-        results = []
+        # Every result yields a source and a result entry, so those lists are
+        # sized up front and filled by index; chunks only exist for some results
+        raw_results = search.results
+        results: List[Dict[str, Any]] = [None] * len(raw_results)  # type: ignore[list-item]
         chunks = []
-        sources = []
+        sources: List[Dict[str, Any]] = [None] * len(raw_results)  # type: ignore[list-item]
         
-        for r in search.results:
+        for i, r in enumerate(raw_results):
+            title = r.title
+            url = r.url
             source = {
-                "title": r.title,
-                "url": r.url,
+                "title": title,
+                "url": url,
             }
             date = getattr(r, "date", None) or getattr(r, "last_updated", None)
             if date:
                 source["date"] = date
             
-            sources.append(source)
+            sources[i] = source
             
             # Perplexity API returns chunks (text excerpts from web pages)
             # Check for chunks field first (Perplexity's terminology)
@@ -124,8 +239,14 @@ def search_perplexity(
             # Try different possible field names
             if hasattr(r, "chunks") and r.chunks:
                 # If chunks is a list, join them
-                if isinstance(r.chunks, list):
-                    chunk_text = "\n\n".join(str(chunk) for chunk in r.chunks if chunk)
+                raw_chunks = r.chunks
+                if isinstance(raw_chunks, list):
+                    # Join from a list (str.join builds one from a generator anyway),
+                    # and skip the str() conversion when every chunk is already text
+                    if all(isinstance(chunk, str) for chunk in raw_chunks):
+                        chunk_text = "\n\n".join([chunk for chunk in raw_chunks if chunk])
+                    else:
+                        chunk_text = "\n\n".join([str(chunk) for chunk in raw_chunks if chunk])
                 else:
                     chunk_text = str(r.chunks) if r.chunks else None
             elif hasattr(r, "chunk") and r.chunk:
@@ -137,37 +258,40 @@ def search_perplexity(
                 # Last resort: try to get any text content
                 chunk_text = None
             
-            # Create chunk data (using Perplexity's terminology)
+            # Create chunk and result records in one pass (using Perplexity's terminology)
             if chunk_text:
-                chunk_data = {
-                    "title": r.title,
-                    "url": r.url,
-                    "source": r.url,
+                chunk_length = len(chunk_text)
+                chunk_tokens = _count_tokens(chunk_text)
+                chunks.append({
+                    "title": title,
+                    "url": url,
+                    "source": url,
                     "chunk": chunk_text,  # Use "chunk" instead of "snippet"
-                    "chunk_length": len(chunk_text),
-                    "chunk_tokens": len(chunk_text.split())  # Approximate token count
+                    "chunk_length": chunk_length,
+                    "chunk_tokens": chunk_tokens,
+                })
+                results[i] = {
+                    "title": title,
+                    "url": url,
+                    "chunk": chunk_text,
+                    "date": date,
+                    "chunk_length": chunk_length,
+                    "chunk_tokens": chunk_tokens,
+                }
+            else:
+                results[i] = {
+                    "title": title,
+                    "url": url,
+                    "chunk": chunk_text,
+                    "date": date,
                 }
-                chunks.append(chunk_data)
-            
-            result_item = {
-                "title": r.title,
-                "url": r.url,
-                "chunk": chunk_text,  # Use "chunk" instead of "snippet"
-                "date": date
-            }
-            
-            if chunk_text:
-                result_item["chunk_length"] = len(chunk_text)
-                result_item["chunk_tokens"] = len(chunk_text.split())
-            
-            results.append(result_item)
         
         return {
             "sources": sources,
             "chunks": chunks,
             "results": results,
             "query": query,
-            "_inspection_info": inspection_info if 'inspection_info' in locals() else None
+            "_inspection_info": inspection_info
         }
     
     except Exception as e:
@@ -182,59 +306,63 @@ def search_perplexity(
 
 def display_search_results(result: Dict[str, Any], max_sources: int = 20, max_chunks: int = 20) -> None:
     """Display search results: sources and chunks."""
-    print(f"\n{'='*70}")
-    print(f"🔍 SEARCH RESULTS: {result['query']}")
-    print(f"{'='*70}")
+    # Collect lines and write once, instead of one print() per line
+    out: List[str] = []
+    out.append(f"\n{'='*70}")
+    out.append(f"🔍 SEARCH RESULTS: {result['query']}")
+    out.append(f"{'='*70}")
     
     # Display sources
     sources = result.get("sources", [])
     if sources:
-        print(f"\n📚 SOURCES ({len(sources)} found, showing {min(len(sources), max_sources)})")
-        print("-" * 70)
+        out.append(f"\n📚 SOURCES ({len(sources)} found, showing {min(len(sources), max_sources)})")
+        out.append("-" * 70)
         for idx, source in enumerate(sources[:max_sources], 1):
             title = source.get('title', 'Untitled')
             url = source.get('url', 'N/A')
             date = source.get('date')
-            print(f"\n{idx}. {title}")
-            print(f"   URL: {url}")
+            out.append(f"\n{idx}. {title}")
+            out.append(f"   URL: {url}")
             if date:
-                print(f"   Date: {date}")
+                out.append(f"   Date: {date}")
     else:
-        print("\n⚠️  No sources found")
+        out.append("\n⚠️  No sources found")
     
     # Display chunks (Perplexity's terminology)
     chunks = result.get("chunks", [])
     if chunks:
-        print(f"\n📄 CHUNKS ({len(chunks)} found, showing {min(len(chunks), max_chunks)})")
-        print("-" * 70)
+        out.append(f"\n📄 CHUNKS ({len(chunks)} found, showing {min(len(chunks), max_chunks)})")
+        out.append("-" * 70)
         total_chars = 0
         total_tokens = 0
         for idx, chunk_data in enumerate(chunks[:max_chunks], 1):
-            print(f"\n--- Chunk {idx} ---")
+            out.append(f"\n--- Chunk {idx} ---")
             title = chunk_data.get('title', 'Untitled')
             url = chunk_data.get('url', 'N/A')
             chunk_text = chunk_data.get('chunk', '')
             chunk_length = chunk_data.get('chunk_length', len(chunk_text) if chunk_text else 0)
             chunk_tokens = chunk_data.get('chunk_tokens', 0)
             
-            print(f"Title: {title}")
-            print(f"URL: {url}")
+            out.append(f"Title: {title}")
+            out.append(f"URL: {url}")
             if chunk_text:
-                print(f"Length: {chunk_length:,} characters (~{chunk_tokens:,} tokens)")
-                print(f"\nChunk Content:")
-                print(chunk_text)
+                out.append(f"Length: {chunk_length:,} characters (~{chunk_tokens:,} tokens)")
+                out.append(f"\nChunk Content:")
+                out.append(chunk_text)
                 total_chars += chunk_length
                 total_tokens += chunk_tokens
             else:
-                print("⚠️  No chunk content available")
+                out.append("⚠️  No chunk content available")
         
         if chunks:
-            print(f"\n📊 Summary:")
-            print(f"   Total characters: {total_chars:,}")
-            print(f"   Total tokens (approx): {total_tokens:,}")
-            print(f"   Average per chunk: {total_chars // len(chunks):,} characters (~{total_tokens // len(chunks):,} tokens)")
+            out.append(f"\n📊 Summary:")
+            out.append(f"   Total characters: {total_chars:,}")
+            out.append(f"   Total tokens (approx): {total_tokens:,}")
+            out.append(f"   Average per chunk: {total_chars // len(chunks):,} characters (~{total_tokens // len(chunks):,} tokens)")
     else:
-        print("\n⚠️  No chunks available")
+        out.append("\n⚠️  No chunks available")
+    
+    sys.stdout.write("\n".join(out) + "\n")
 
 
 def inspect_result_fields(result_obj) -> None:
@@ -264,31 +392,42 @@ def test_max_tokens(query: str, api_key: str, test_values: List[int] = [1024, 20
     print("🧪 TESTING DIFFERENT max_tokens_per_page VALUES")
     print(f"{'='*70}")
     
-    for max_tokens_per_page in test_values:
+    # Issue all searches at once from worker threads so the sweep costs about
+    # one round-trip, not one per value. Threads rather than asyncio keep this
+    # usable from inside a running event loop, e.g. a Jupyter notebook.
+    def _search_one(max_tokens_per_page: int) -> Any:
         try:
-            result = search_perplexity(
+            return search_perplexity(
                 query,
                 api_key=api_key,
                 max_results=3,
                 max_tokens_per_page=max_tokens_per_page
             )
-            
-            chunks = result.get("chunks", [])
-            if chunks:
-                total_chars = sum(chunk.get('chunk_length', 0) for chunk in chunks)
-                total_tokens = sum(chunk.get('chunk_tokens', 0) for chunk in chunks)
-                avg_chars = total_chars // len(chunks) if chunks else 0
-                avg_tokens = total_tokens // len(chunks) if chunks else 0
-                print(f"\nmax_tokens_per_page={max_tokens_per_page}:")
-                print(f"  - Chunks: {len(chunks)}")
-                print(f"  - Total chars: {total_chars:,}")
-                print(f"  - Total tokens (approx): {total_tokens:,}")
-                print(f"  - Avg chars/chunk: {avg_chars:,}")
-                print(f"  - Avg tokens/chunk: {avg_tokens:,}")
-            else:
-                print(f"\nmax_tokens_per_page={max_tokens_per_page}: No chunks returned")
         except Exception as e:
-            print(f"\nmax_tokens_per_page={max_tokens_per_page}: Error - {e}")
+            return e
+    
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(len(test_values), 1)) as executor:
+        sweep_results = list(executor.map(_search_one, test_values))
+    
+    for max_tokens_per_page, result in zip(test_values, sweep_results):
+        if isinstance(result, Exception):
+            print(f"\nmax_tokens_per_page={max_tokens_per_page}: Error - {result}")
+            continue
+        
+        chunks = result.get("chunks", [])
+        if chunks:
+            total_chars = sum(chunk.get('chunk_length', 0) for chunk in chunks)
+            total_tokens = sum(chunk.get('chunk_tokens', 0) for chunk in chunks)
+            avg_chars = total_chars // len(chunks) if chunks else 0
+            avg_tokens = total_tokens // len(chunks) if chunks else 0
+            print(f"\nmax_tokens_per_page={max_tokens_per_page}:")
+            print(f"  - Chunks: {len(chunks)}")
+            print(f"  - Total chars: {total_chars:,}")
+            print(f"  - Total tokens (approx): {total_tokens:,}")
+            print(f"  - Avg chars/chunk: {avg_chars:,}")
+            print(f"  - Avg tokens/chunk: {avg_tokens:,}")
+        else:
+            print(f"\nmax_tokens_per_page={max_tokens_per_page}: No chunks returned")
 
 
 def main():
@@ -300,7 +439,7 @@ def main():
     else:
         query = "Latest developments in artificial intelligence 2025"
 
-    api_key = os.getenv("PERPLEXITY_API_KEY")
+    api_key = _API_KEY
     
     if not api_key:
         print("\n❌ Error: PERPLEXITY_API_KEY not set")
@@ -314,7 +453,8 @@ def main():
             api_key=api_key,
             max_results=10,
             max_tokens=25000,  # Total tokens across all results
-            max_tokens_per_page=2048  # Tokens per page (default)
+            max_tokens_per_page=2048,  # Tokens per page (default)
+            debug=True  # Include raw SDK fields for the inspection below
         )
         display_search_results(result)
         
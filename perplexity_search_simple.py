@@ -5,15 +5,164 @@ Uses the Search API directly via HTTP requests (no SDK).
 Just send a query and get JSON results.
 """
 
+import argparse
+import asyncio
+import atexit
 import os
 import json
 import sys
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, AsyncIterator
 from dotenv import load_dotenv
 import httpx
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import h2  # noqa: F401 - only needed so httpx can negotiate HTTP/2
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
 load_dotenv()
 
+PERPLEXITY_SEARCH_URL = "https://api.perplexity.ai/search"
+
+# Read the API key once at import; it is validated when a search is made.
+_API_KEY = os.getenv("PERPLEXITY_API_KEY")
+_AUTH_HEADERS = {
+    "Authorization": f"Bearer {_API_KEY}",
+    "Content-Type": "application/json",
+} if _API_KEY else None
+
+# Shared HTTP clients, created on first use. Reusing them keeps keep-alive
+# connections to the API warm instead of paying a TCP + TLS handshake per call.
+_client: Optional[httpx.Client] = None
+# An AsyncClient's connection pool belongs to the event loop it is first used
+# on, so the async client is remembered together with that loop and replaced
+# when called from a different one (e.g. each asyncio.run() in a script).
+# Each async client is closed while its own loop is still running: it is
+# parked in a suspended async generator, which asyncio.run() finalizes via
+# loop.shutdown_asyncgens() before closing the loop. Closing it later from
+# another loop is not possible once its loop has closed.
+_async_client: Optional[httpx.AsyncClient] = None
+_async_client_loop: Optional[asyncio.AbstractEventLoop] = None
+_async_client_lifetime: Optional[AsyncIterator[None]] = None
+
+_LIMITS = httpx.Limits(max_keepalive_connections=20, max_connections=40)
+
+
+def _get_client() -> httpx.Client:
+    """Return the shared httpx client, creating it on first use."""
+    global _client
+    if _client is None:
+        _client = httpx.Client(
+            timeout=30.0,
+            http2=HTTP2_AVAILABLE,
+            limits=_LIMITS,
+            headers=_AUTH_HEADERS,
+        )
+        atexit.register(_client.close)
+    return _client
+
+
+async def _own_async_client(client: httpx.AsyncClient) -> AsyncIterator[None]:
+    """Suspend until the event loop shuts down its async generators, then close client."""
+    try:
+        yield
+    finally:
+        await client.aclose()
+
+
+async def _get_async_client() -> httpx.AsyncClient:
+    """Return the async httpx client for the running event loop, creating it if needed."""
+    global _async_client, _async_client_loop, _async_client_lifetime
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_client_loop is not loop:
+        client = httpx.AsyncClient(
+            timeout=30.0,
+            http2=HTTP2_AVAILABLE,
+            limits=_LIMITS,
+            headers=_AUTH_HEADERS,
+        )
+        lifetime = _own_async_client(client)
+        # Starting the generator registers it with this loop's shutdown hooks
+        await lifetime.__anext__()
+        _async_client, _async_client_loop, _async_client_lifetime = client, loop, lifetime
+    return _async_client
+
+
+def _loads(content: bytes) -> Any:
+    """Decode a JSON response body, using orjson when it is installed."""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def _dumps(obj: Any) -> bytes:
+    """Encode obj as a compact JSON request body, using orjson when it is installed."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+
+def _dumps_pretty(obj: Any) -> str:
+    """Encode obj as indented JSON text, using orjson when it is installed."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+    return json.dumps(obj, indent=2, ensure_ascii=False)
+
+
+def _require_api_key() -> None:
+    """Raise ValueError if PERPLEXITY_API_KEY was not set at import time."""
+    if not _API_KEY:
+        raise ValueError(
+            "PERPLEXITY_API_KEY environment variable is not set. "
+            "Set it in your .env file or environment."
+        )
+
+
+def _build_request_body(
+    query: str,
+    max_results: int,
+    max_tokens: Optional[int],
+    max_tokens_per_page: int,
+    search_domain_filter: Optional[List[str]],
+    search_recency_filter: Optional[str],
+) -> bytes:
+    """Encode the Search API request body, including only the optional fields that are set."""
+    payload: Dict[str, Any] = {
+        "query": query,
+        "max_results": max_results,
+        "max_tokens_per_page": max_tokens_per_page,
+    }
+    
+    if max_tokens is not None:
+        payload["max_tokens"] = max_tokens
+    
+    if search_domain_filter:
+        payload["search_domain_filter"] = search_domain_filter
+    
+    if search_recency_filter:
+        payload["search_recency_filter"] = search_recency_filter
+    
+    return _dumps(payload)
+
+
+def _api_error(e: httpx.HTTPError) -> Exception:
+    """Translate an httpx error into the exception raised to callers."""
+    if isinstance(e, httpx.HTTPStatusError):
+        if e.response.status_code == 404:
+            return Exception(
+                "Search API is not enabled for your API key. "
+                "Please check your Perplexity API subscription."
+            )
+        return Exception(f"Perplexity API error: {e.response.status_code} - {e.response.text}")
+    return Exception(f"Network error: {str(e)}")
+
 
 def search_perplexity(
     query: str,
@@ -37,77 +186,73 @@ def search_perplexity(
     Returns:
         Dictionary with search results
     """
-    api_key = os.getenv("PERPLEXITY_API_KEY")
-    if not api_key:
-        raise ValueError(
-            "PERPLEXITY_API_KEY environment variable is not set. "
-            "Set it in your .env file or environment."
-        )
+    _require_api_key()
+    request_body = _build_request_body(
+        query, max_results, max_tokens, max_tokens_per_page,
+        search_domain_filter, search_recency_filter,
+    )
     
-    # Prepare request payload
-    payload: Dict[str, Any] = {
-        "query": query,
-        "max_results": max_results,
-        "max_tokens_per_page": max_tokens_per_page,
-    }
-    
-    if max_tokens is not None:
-        payload["max_tokens"] = max_tokens
-    
-    if search_domain_filter:
-        payload["search_domain_filter"] = search_domain_filter
-    
-    if search_recency_filter:
-        payload["search_recency_filter"] = search_recency_filter
+    try:
+        response = _get_client().post(
+            PERPLEXITY_SEARCH_URL,
+            content=request_body,
+        )
+        response.raise_for_status()
+        return _loads(response.content)
+    except httpx.HTTPError as e:
+        raise _api_error(e)
+
+
+async def async_search_perplexity(
+    query: str,
+    max_results: int = 10,
+    max_tokens: Optional[int] = None,
+    max_tokens_per_page: int = 2048,
+    search_domain_filter: Optional[List[str]] = None,
+    search_recency_filter: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Async variant of search_perplexity for running several searches concurrently.
     
-    # Make API request
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
+    Takes the same arguments and returns the same dictionary as search_perplexity.
+    """
+    _require_api_key()
+    request_body = _build_request_body(
+        query, max_results, max_tokens, max_tokens_per_page,
+        search_domain_filter, search_recency_filter,
+    )
     
     try:
-        with httpx.Client(timeout=30.0) as client:
-            response = client.post(
-                "https://api.perplexity.ai/search",
-                json=payload,
-                headers=headers
-            )
-            response.raise_for_status()
-            return response.json()
-    except httpx.HTTPStatusError as e:
-        if e.response.status_code == 404:
-            raise Exception(
-                "Search API is not enabled for your API key. "
-                "Please check your Perplexity API subscription."
-            )
-        raise Exception(f"Perplexity API error: {e.response.status_code} - {e.response.text}")
-    except httpx.RequestError as e:
-        raise Exception(f"Network error: {str(e)}")
+        response = await (await _get_async_client()).post(
+            PERPLEXITY_SEARCH_URL,
+            content=request_body,
+        )
+        response.raise_for_status()
+        return _loads(response.content)
+    except httpx.HTTPError as e:
+        raise _api_error(e)
 
 
 def main():
     """Main function - simple search and JSON output."""
-    if len(sys.argv) < 2:
-        print("Usage: python perplexity_search_simple.py <query> [max_results]")
-        print("Example: python perplexity_search_simple.py 'latest AI news' 5")
-        sys.exit(1)
-    
-    # Check if last argument is a number (max_results)
-    max_results = 10
-    query_parts = sys.argv[1:]
-    
-    if len(query_parts) > 1 and query_parts[-1].isdigit():
-        max_results = int(query_parts[-1])
-        query = " ".join(query_parts[:-1])
-    else:
-        query = " ".join(query_parts)
+    parser = argparse.ArgumentParser(
+        description="Search the web with Perplexity's Search API and print the JSON response.",
+        epilog="Example: python perplexity_search_simple.py latest AI news -n 5",
+    )
+    parser.add_argument("query", nargs="+", help="search query (multiple words are joined)")
+    parser.add_argument(
+        "-n", "--max-results", type=int, default=10,
+        help="maximum number of results (1-20, default: 10)",
+    )
+    args = parser.parse_args()
+    query = " ".join(args.query)
+    max_results = args.max_results
     
     try:
         result = search_perplexity(query, max_results=max_results)
         
         # Output as JSON
-        print(json.dumps(result, indent=2))
+        print(_dumps_pretty(result))
         
     except Exception as e:
         print(f"Error: {e}", file=sys.stderr)